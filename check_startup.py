@@ -0,0 +1,39 @@
+import re
+import sys
+import statistics
+import subprocess
+
+from video_converter.cli import startup_target_ms, lazy_modules
+
+
+def measure_import_ms():
+    """Cumulative import time of video_converter.cli in a fresh interpreter, from python -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import video_converter.cli'],
+                            capture_output=True, text=True, check=True)
+    match = re.search(r'^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*video_converter\.cli$', result.stderr, re.MULTILINE)
+    return int(match.group(1)) / 1000
+
+
+def loaded_lazy_modules():
+    code = f"import sys, video_converter.cli; print(' '.join(m for m in {lazy_modules!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return result.stdout.split()
+
+
+def main(runs=7):
+    # The first run may compile .pyc files, so it is not counted
+    measure_import_ms()
+    times = [measure_import_ms() for _ in range(runs)]
+    median = statistics.median(times)
+    print(f"video_converter.cli import: median {median:.1f} ms over {runs} runs "
+          f"(min {min(times):.1f}, max {max(times):.1f}), target {startup_target_ms} ms")
+    ok = median <= startup_target_ms
+    loaded = loaded_lazy_modules()
+    if loaded:
+        print(f"Modules loaded at startup that should be lazy: {', '.join(loaded)}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# Public helpers are imported on first access so that importing the package
+# (or running the CLI) does not pull in every conversion module.
+_lazy_attrs = {
+    'in_format': 'common',
+    'setup_logging': 'common',
+    'cmd_runner': 'common',
+    'get_video_duration': 'common',
+    'copy_metadata': 'metadata',
+    'commit_file': 'commit',
+    'convert_video': 'video',
+    'convert_video_renditions': 'video',
+    'load_renditions': 'video',
+    'process_directory': 'video',
+    'watch_directory': 'watch',
+    'convert_images': 'photo',
+    'convert_audio': 'audio',
+    'find_similar': 'index',
+}
+
+__all__ = list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        from importlib import import_module
+        return getattr(import_module(f'.{_lazy_attrs[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
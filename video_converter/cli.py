@@ -0,0 +1,166 @@
+"""
+Single command line entry point: python -m video_converter {video,photo,audio} ...
+
+Only argparse is imported at startup; the conversion modules (and tqdm, subprocess,
+...) are imported by the subcommand that needs them, and logging is configured here
+rather than at import time. Startup target: importing video_converter.cli takes
+under startup_target_ms on top of interpreter start; check_startup.py measures it.
+"""
+import sys
+import argparse
+
+startup_target_ms = 20
+# Modules that must not be loaded just to parse arguments
+lazy_modules = ('pathlib', 'subprocess', 'tqdm', 'sqlite3', 'numpy')
+
+default_video_ffmpeg_args = "-loglevel error -stats -c:v libsvtav1 -preset 8 -crf 36 -pix_fmt yuv420p10le -svtav1-params film-grain=8 -svtav1-params adaptive-film-grain=1 -c:a libopus -b:a 64k"
+
+
+def check_index_dependencies(args):
+    if args.index:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            sys.exit("--index requires numpy")
+
+
+def split_single_file(path, input_root):
+    """
+    For a single input file, return (root, file) so its output keeps the same relative
+    path as in a run over input_root; without input_root the file's own folder is used.
+    """
+    from pathlib import Path
+    path = Path(path)
+    root = Path(input_root) if input_root else path.parent
+    try:
+        path.resolve().relative_to(root.resolve())
+    except ValueError:
+        sys.exit(f"{path} is not inside --input_root {root}")
+    return root.resolve(), path.resolve()
+
+
+def run_video(args):
+    import logging
+    from pathlib import Path
+    from .video import load_renditions, process_directory
+
+    check_index_dependencies(args)
+
+    logging.info("Starting video conversion...")
+    try:
+        renditions = load_renditions(args.renditions, args.output_dir) if args.renditions else None
+    except (OSError, ValueError) as e:
+        sys.exit(f"Invalid renditions profile {args.renditions}: {e}")
+    if args.watch:
+        from .watch import watch_directory
+        watch_directory(args.input_dir, args.output_dir, args.delete, args.ffmpeg_args,
+                        max_resolution=args.max_resolution, temp_dir=args.temp_dir, renditions=renditions,
+                        poll_interval=args.poll_interval, settle_time=args.settle_time, force_poll=args.poll,
+                        index=args.index)
+        return
+    input_path = Path(args.input_dir)
+    if input_path.is_file():
+        # Single file: skip the directory scan, output goes to output_dir/<path relative to input_root>
+        input_root, input_path = split_single_file(input_path, args.input_root)
+        process_directory(input_root, args.output_dir,
+                          args.delete, args.ffmpeg_args, max_resolution=args.max_resolution, all_files=[input_path],
+                          temp_dir=args.temp_dir, renditions=renditions, index=args.index)
+    else:
+        process_directory(args.input_dir, args.output_dir,
+                          args.delete, args.ffmpeg_args, max_resolution=args.max_resolution, temp_dir=args.temp_dir,
+                          renditions=renditions, index=args.index)
+    logging.info("Finished video conversion.")
+
+
+def run_photo(args):
+    from pathlib import Path
+    from .photo import convert_images
+
+    check_index_dependencies(args)
+    kwargs = {}
+    if args.video_ffmpeg_args:
+        kwargs['video_ffmpeg_args'] = args.video_ffmpeg_args
+    source_path = Path(args.source_dir)
+    if source_path.is_file():
+        # Single file: skip the directory scan
+        source_path, source_file = split_single_file(source_path, args.input_root)
+        kwargs['all_files'] = [source_file]
+    convert_images(source_path, args.target_dir, args.quality, args.max_resolution,
+                   max_workers=args.max_workers, index=args.index, **kwargs)
+
+
+def run_audio(args):
+    from .audio import convert_audio
+
+    input_dir, input_root = args.input_dir, None
+    if args.input_root:
+        input_root, input_dir = split_single_file(args.input_dir, args.input_root)
+    convert_audio(str(input_dir), args.output_dir, input_root=input_root and str(input_root))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='video_converter', description="Batch convert media with ffmpeg.")
+    parser.add_argument("--log_file", type=str,
+                        help="Append to this log file instead of creating a new one under logs/.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    video = subparsers.add_parser('video', help="Batch convert videos with ffmpeg.")
+    video.add_argument("input_dir", type=str,
+                       help="Input directory containing video files, or a single video file.")
+    video.add_argument("output_dir", type=str,
+                       help="Output directory for converted videos.")
+    video.add_argument("--delete", action='store_true',
+                       help="Delete original files after conversion.")
+    video.add_argument("--ffmpeg_args", type=str, help="Additional arguments to pass to ffmpeg.",
+                       default=default_video_ffmpeg_args)
+    video.add_argument("--max_resolution", type=int,
+                       help="Maximum resolution (in pixels).")
+    video.add_argument("--input_root", type=str,
+                       help="When input_dir is a single file, the directory its output path is relative to.")
+    video.add_argument("--temp_dir", type=str, help="Temporary directory for processing files.")
+    video.add_argument("--renditions", type=str,
+                       help="JSON file describing multiple output renditions encoded from a single decode.")
+    video.add_argument("--watch", action='store_true',
+                       help="Keep running and convert new files as they appear in input_dir.")
+    video.add_argument("--poll", action='store_true',
+                       help="In watch mode, poll the input directory instead of using inotify.")
+    video.add_argument("--poll_interval", type=float, default=30,
+                       help="Seconds between directory scans when polling.")
+    video.add_argument("--settle_time", type=float, default=10,
+                       help="Seconds a file's size and mtime must stay unchanged before it is converted.")
+    video.add_argument("--index", action='store_true',
+                       help="Also write thumbnails, contact sheets and perceptual hashes to an index in output_dir.")
+    video.set_defaults(func=run_video)
+
+    photo = subparsers.add_parser('photo', help="Convert images to AVIF format.")
+    photo.add_argument('source_dir', type=str, help='Source directory, or a single file')
+    photo.add_argument('target_dir', type=str, help='Target directory')
+    photo.add_argument('--input_root', type=str,
+                       help='When source_dir is a single file, the directory its output path is relative to')
+    photo.add_argument('--quality', type=int, default=50, help='quality value')
+    photo.add_argument('--max_resolution', type=int,
+                       default=3024 * 4032, help='Max resolution in pixels')
+    photo.add_argument('--max_workers', type=int, default=4,
+                       help='Max number of workers')
+    photo.add_argument("--video_ffmpeg_args", type=str, help="Additional arguments to pass to ffmpeg.")
+    photo.add_argument("--index", action='store_true',
+                       help="Also write thumbnails, contact sheets and perceptual hashes of the converted "
+                            "videos to an index in target_dir. Images are not indexed while image "
+                            "conversion is disabled in convert_images.")
+    photo.set_defaults(func=run_photo)
+
+    audio = subparsers.add_parser('audio', help="Convert audio files to Opus, copying everything else.")
+    audio.add_argument('input_dir', type=str, help='Input directory, or a single file')
+    audio.add_argument('output_dir', type=str, help='Output directory')
+    audio.add_argument('--input_root', type=str,
+                       help='When input_dir is a single file, the directory its output path is relative to')
+    audio.set_defaults(func=run_audio)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from .common import setup_logging
+    setup_logging(args.log_file)
+    args.func(args)
+
@@ -0,0 +1,140 @@
+import os
+import re
+import errno
+import logging
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+scratch_prefix = 'video_converter_'
+# Older than any single conversion, so files still in use by a concurrent job are left alone
+stale_temp_age = 24 * 3600
+temp_name_pattern = re.compile(r'^\..*\.[0-9a-f]{32}\.tmp(\.[^.]*)?$')
+cleaned_dirs = set()
+
+
+def make_temp_path(directory, target_file):
+    """Unique temporary name for target_file in directory, keeping its extension for ffmpeg/exiftool."""
+    return Path(directory) / f".{target_file.stem}.{uuid.uuid4().hex}.tmp{target_file.suffix}"
+
+
+def cleanup_stale_temp_files(directories=(), temp_dir=None, max_age=stale_temp_age):
+    """
+    Remove temp outputs and part files directly inside directories (the folders about to
+    be written to), and scratch directories in temp_dir, left behind by jobs that were
+    killed. Only those folders are listed, never whole output trees, and each one only
+    once per process.
+    """
+    cutoff = time.time() - max_age
+    for directory in directories:
+        directory = os.path.abspath(directory)
+        if directory in cleaned_dirs:
+            continue
+        cleaned_dirs.add(directory)
+        try:
+            with os.scandir(directory) as it:
+                entries = [entry for entry in it if temp_name_pattern.match(entry.name)]
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    logging.info(f"Removed stale temp file {entry.path}")
+            except OSError as e:
+                logging.error(f"Error removing stale temp file {entry.path}: {e}")
+    if temp_dir and os.path.isdir(temp_dir):
+        with os.scandir(temp_dir) as it:
+            for entry in it:
+                try:
+                    if entry.name.startswith(scratch_prefix) and entry.is_dir() and entry.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                        logging.info(f"Removed stale scratch directory {entry.path}")
+                except OSError as e:
+                    logging.error(f"Error removing stale scratch directory {entry.path}: {e}")
+
+
+def fsync_file(path):
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(path):
+    # Directories can only be opened for fsync on POSIX
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def reflink_file(fsrc, fdst):
+    """Try to clone fsrc into fdst with the FICLONE ioctl (btrfs, XFS, ...). Returns True on success."""
+    try:
+        import fcntl
+        FICLONE = 0x40049409
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def transfer_file(source_path, target_path):
+    """Copy source_path to target_path with as little userspace copying as possible, then fsync it."""
+    with open(source_path, 'rb') as fsrc, open(target_path, 'wb') as fdst:
+        if not reflink_file(fsrc, fdst):
+            copied = 0
+            if hasattr(os, 'copy_file_range'):
+                size = os.fstat(fsrc.fileno()).st_size
+                try:
+                    while copied < size:
+                        n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied, copied, copied)
+                        if n == 0:
+                            break
+                        copied += n
+                except OSError as e:
+                    # Kernels/filesystems without cross-device copy_file_range support
+                    if copied > 0 or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                        raise
+            if copied == 0:
+                fsrc.seek(0)
+                fdst.seek(0)
+                shutil.copyfileobj(fsrc, fdst, 16 * 1024 * 1024)
+        fdst.flush()
+        os.fsync(fdst.fileno())
+    source_size = os.path.getsize(source_path)
+    target_size = os.path.getsize(target_path)
+    if source_size != target_size:
+        raise OSError(f"Size mismatch after copying {source_path} to {target_path}: {source_size} vs {target_size}")
+
+
+def commit_file(temp_file, target_file):
+    """
+    Atomically move a finished temp_file into place at target_file.
+
+    On the same filesystem this is a plain rename. Across devices the file is
+    transferred once into a unique temp name next to the target, verified,
+    fsynced and renamed into place, so the target never appears half-written.
+    """
+    temp_file = Path(temp_file)
+    target_file = Path(target_file)
+    fsync_file(temp_file)
+    try:
+        os.replace(temp_file, target_file)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        part_file = make_temp_path(target_file.parent, target_file)
+        try:
+            transfer_file(temp_file, part_file)
+            shutil.copystat(temp_file, part_file)
+            os.replace(part_file, target_file)
+        except Exception:
+            if part_file.exists():
+                os.remove(part_file)
+            raise
+        os.remove(temp_file)
+    fsync_dir(target_file.parent)
@@ -0,0 +1,59 @@
+import json
+import logging
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+in_format = ('.mp4', '.avi', '.mkv', '.flv', '.rmvb', '.wmv',
+             '.mov', '.mpg', '.mpeg', '.m4v', '.3gp', '.f4v', '.webm', '.ts')
+
+
+def setup_logging(log_file=None):
+    # A fixed log_file is appended to, so per-file hook invocations don't create a new log each time
+    if log_file:
+        log_filepath = Path(log_file)
+        log_filepath.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        log_dir = Path('logs')
+        log_dir.mkdir(exist_ok=True)
+        log_filename = datetime.now().strftime('%Y-%m-%d_%H-%M-%S.log')
+        log_filepath = log_dir / log_filename
+    logging.basicConfig(
+        filename=log_filepath,
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    console.setFormatter(formatter)
+    logging.getLogger('').addHandler(console)
+
+
+def get_video_duration(filename):
+    result = subprocess.check_output(
+        ["ffprobe", "-v", "quiet", "-show_format", "-print_format", "json", filename])
+    fields = json.loads(result)
+    duration_seconds = float(fields["format"]["duration"])
+    return duration_seconds
+
+
+def cmd_runner(cmd):
+    try:
+        # 使用 os.setpgrp 将新创建的进程放入一个新的进程组
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True  # 关键修改
+        )
+        result.check_returncode()
+        return result
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error running command {cmd}: {e.stderr}")
+        return False
+    except Exception as e:
+        logging.error(f"Error running command {cmd}: {e}")
+        return False
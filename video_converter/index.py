@@ -0,0 +1,181 @@
+import os
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+from .commit import make_temp_path, cleanup_stale_temp_files
+
+index_dirname = '.media_index'
+thumbnail_size = 320
+sheet_tile_width = 160
+sheet_grid = (4, 4)
+# pHash is taken from a 32x32 DCT, dHash from horizontal gradients of a 9x8 image
+phash_size = 32
+dhash_size = (9, 8)
+
+
+def open_index(index_dir):
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_dir / 'index.sqlite', timeout=30)
+    conn.execute('''CREATE TABLE IF NOT EXISTS media (
+                        path TEXT PRIMARY KEY,
+                        kind TEXT,
+                        target TEXT,
+                        phash INTEGER,
+                        dhash INTEGER,
+                        thumbnail TEXT,
+                        contact_sheet TEXT,
+                        updated REAL)''')
+    return conn
+
+
+def prepare_side_outputs(index_dir, relative_path, kind, duration=0):
+    """
+    Plan the side outputs for one source: a thumbnail, a contact sheet for videos, and
+    the small grayscale frames the hashes are computed from. Everything is written to
+    temporary names inside index_dir and only moved into place by finish_side_outputs.
+    """
+    index_dir = Path(index_dir)
+    base = index_dir / 'thumbnails' / relative_path
+    base.parent.mkdir(parents=True, exist_ok=True)
+    cleanup_stale_temp_files([base.parent])
+    side = {
+        'index_dir': index_dir,
+        'relative_path': Path(relative_path).as_posix(),
+        'kind': kind,
+        'duration': duration,
+        'thumbnail': base.with_name(base.name + '.jpg'),
+        'contact_sheet': base.with_name(base.name + '.sheet.jpg') if kind == 'video' else None,
+        'temp': {},
+    }
+    side['temp']['thumbnail'] = make_temp_path(base.parent, side['thumbnail'])
+    if side['contact_sheet']:
+        side['temp']['contact_sheet'] = make_temp_path(base.parent, side['contact_sheet'])
+    side['temp']['phash'] = make_temp_path(base.parent, base.with_name(base.name + '.phash.gray'))
+    side['temp']['dhash'] = make_temp_path(base.parent, base.with_name(base.name + '.dhash.gray'))
+    return side
+
+
+def video_side_output_args(side, input_label):
+    """Return (filters, output_args) that tap the decoded video at input_label in an ffmpeg filter graph."""
+    temp = side['temp']
+    rows, cols = sheet_grid
+    interval = side['duration'] / (rows * cols) if side['duration'] > 0 else 0
+    filters = [
+        f"{input_label}split=2[side_t][side_k]",
+        # Scale before the thumbnail filter so it buffers small frames, not full resolution ones
+        f"[side_t]scale={thumbnail_size}:{thumbnail_size}:force_original_aspect_ratio=decrease,thumbnail,"
+        f"split=3[side_thumb][side_t1][side_t2]",
+        f"[side_t1]scale={phash_size}:{phash_size},format=gray[side_phash]",
+        f"[side_t2]scale={dhash_size[0]}:{dhash_size[1]},format=gray[side_dhash]",
+        # Keyframes spread evenly over the duration
+        f"[side_k]select='eq(pict_type\\,I)*(isnan(prev_selected_t)+gte(t-prev_selected_t\\,{interval:.3f}))',"
+        f"scale={sheet_tile_width}:-2,tile={cols}x{rows}[side_sheet]",
+    ]
+    output_args = [
+        '-map', '[side_thumb]', '-frames:v', '1', '-q:v', '4', str(temp['thumbnail']),
+        '-map', '[side_sheet]', '-frames:v', '1', '-q:v', '4', str(temp['contact_sheet']),
+        '-map', '[side_phash]', '-frames:v', '1', '-f', 'rawvideo', str(temp['phash']),
+        '-map', '[side_dhash]', '-frames:v', '1', '-f', 'rawvideo', str(temp['dhash']),
+    ]
+    return filters, output_args
+
+
+def magick_side_output_args(side):
+    """Return ImageMagick arguments that write the side outputs from the already decoded image."""
+    temp = side['temp']
+    return [
+        '(', '+clone', '-auto-orient', '-thumbnail', f'{thumbnail_size}x{thumbnail_size}',
+        '-quality', '85', '-write', str(temp['thumbnail']), '+delete', ')',
+        '(', '+clone', '-auto-orient', '-resize', f'{phash_size}x{phash_size}!',
+        '-colorspace', 'gray', '-depth', '8', '-write', f"gray:{temp['phash']}", '+delete', ')',
+        '(', '+clone', '-auto-orient', '-resize', f'{dhash_size[0]}x{dhash_size[1]}!',
+        '-colorspace', 'gray', '-depth', '8', '-write', f"gray:{temp['dhash']}", '+delete', ')',
+    ]
+
+
+def read_gray(path, width, height):
+    import numpy as np
+    pixels = np.fromfile(path, dtype=np.uint8)
+    if pixels.size != width * height:
+        raise ValueError(f"Unexpected size for {path}: {pixels.size} bytes, expected {width * height}")
+    return pixels.reshape(height, width).astype(np.float64)
+
+
+def bits_to_int(bits):
+    import numpy as np
+    # Stored as a signed 64 bit integer so it fits in an SQLite INTEGER
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), 'big', signed=True)
+
+
+def compute_phash(pixels):
+    """pHash of a square grayscale image: sign of the low 8x8 DCT coefficients against their median."""
+    import numpy as np
+    n = pixels.shape[0]
+    k = np.arange(n)
+    dct = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    coefficients = (dct @ pixels @ dct.T)[:8, :8].flatten()
+    # The DC term only carries overall brightness
+    median = np.median(coefficients[1:])
+    return bits_to_int(coefficients > median)
+
+
+def compute_dhash(pixels):
+    """dHash of a grayscale image one pixel wider than tall: whether brightness increases to the right."""
+    return bits_to_int((pixels[:, 1:] > pixels[:, :-1]).flatten())
+
+
+def finish_side_outputs(side, target_file):
+    """Hash the sampled frames, move thumbnails into place and record the entry in the index."""
+    temp = side['temp']
+    try:
+        phash = compute_phash(read_gray(temp['phash'], phash_size, phash_size))
+        dhash = compute_dhash(read_gray(temp['dhash'], *dhash_size))
+        images = {}
+        for key in ('thumbnail', 'contact_sheet'):
+            if key in temp and temp[key].exists() and temp[key].stat().st_size > 0:
+                os.replace(temp[key], side[key])
+                images[key] = side[key].relative_to(side['index_dir']).as_posix()
+            else:
+                images[key] = None
+        conn = open_index(side['index_dir'])
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                             (side['relative_path'], side['kind'], str(target_file), phash, dhash,
+                              images['thumbnail'], images['contact_sheet'], time.time()))
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.error(f"Error writing index entry for {target_file}: {e}")
+    finally:
+        discard_side_outputs(side)
+
+
+def discard_side_outputs(side):
+    for path in side['temp'].values():
+        try:
+            if path.exists():
+                os.remove(path)
+        except OSError as e:
+            logging.error(f"Error removing {path}: {e}")
+
+
+def find_similar(index_dir, hash_value, max_distance=10, column='phash'):
+    """Return (path, distance) for indexed media within max_distance bits of hash_value, closest first."""
+    import numpy as np
+    if column not in ('phash', 'dhash'):
+        raise ValueError(f"Unknown hash column: {column}")
+    conn = open_index(index_dir)
+    try:
+        rows = conn.execute(f'SELECT path, {column} FROM media WHERE {column} IS NOT NULL').fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        return []
+    hashes = np.array([row[1] for row in rows], dtype=np.int64)
+    xor = hashes ^ np.int64(hash_value)
+    distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+    return [(rows[i][0], int(distances[i])) for i in np.argsort(distances, kind='stable') if distances[i] <= max_distance]
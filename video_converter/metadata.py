@@ -0,0 +1,80 @@
+import os
+import json
+import logging
+import subprocess
+from datetime import datetime
+
+from .common import in_format, cmd_runner
+
+
+def copy_metadata(source_path, target_path):
+    try:
+        file_time = datetime.fromtimestamp(source_path.stat().st_atime)
+        creation_time = datetime.fromtimestamp(source_path.stat().st_ctime)
+        modification_time = datetime.fromtimestamp(source_path.stat().st_mtime)
+        write_time = min(file_time, creation_time, modification_time)
+        os.utime(target_path, (file_time.timestamp(), modification_time.timestamp()))
+    except Exception as e:
+        logging.error(f"Error copying metadata: {e}")
+    try:
+        exif_info = subprocess.check_output(['exiftool', '-j', source_path])
+    except subprocess.CalledProcessError:
+        exif_info = None
+
+    def write_exif():
+        try:
+            subprocess.run(['exiftool', f'-DateTimeOriginal={write_time.strftime("%Y:%m:%d %H:%M:%S")}',
+                            f'-CreateDate={write_time.strftime("%Y:%m:%d %H:%M:%S")}',
+                            f'-ModifyDate={write_time.strftime("%Y:%m:%d %H:%M:%S")}',
+                            '-overwrite_original', target_path], check=True)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Error writing EXIF data: {e}")
+
+    exif_info_json = {}
+    if exif_info:
+        try:
+            subprocess.run(['exiftool', '-tagsFromFile', source_path,
+                            '-all:all', '-overwrite_original', target_path], check=True)
+            exif_info_json = json.loads(exif_info.decode())[0]
+            if 'DateTimeOriginal' not in exif_info_json:
+                cmd = ['exiftool', '-DateTimeOriginal=' + write_time.strftime('%Y:%m:%d %H:%M:%S'),
+                       str(target_path), '-overwrite_original']
+                assert cmd_runner(cmd)
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Error copying EXIF data: {e}")
+            write_exif()
+    else:
+        write_exif()
+    if target_path.suffix.lower() in in_format and 'Creation Date' not in subprocess.run(['exiftool', '-QuickTime:CreationDate', str(source_path), '-m'], capture_output=True, text=True).stdout:
+        def try_get_time(exiftime_list, exif_info_json, key):
+            if key in exif_info_json:
+                try:
+                    if '+' in exif_info_json[key]:
+                        format_str = '%Y:%m:%d %H:%M:%S%z'
+                    else:
+                        format_str = '%Y:%m:%d %H:%M:%S'
+                    exiftime_list.append(datetime.strptime(exif_info_json[key], format_str))
+                except ValueError:
+                    pass
+            return exiftime_list
+
+        exiftime = [write_time]
+        exiftime = try_get_time(exiftime, exif_info_json, 'FileModifyDate')
+        exiftime = try_get_time(exiftime, exif_info_json, 'FileAccessDate')
+        exiftime = try_get_time(exiftime, exif_info_json, 'FileCreateDate')
+        exiftime = try_get_time(exiftime, exif_info_json, 'CreateDate')
+        exiftime = try_get_time(exiftime, exif_info_json, 'ModifyDate')
+        exiftime = try_get_time(exiftime, exif_info_json, 'DateTimeOriginal')
+        exiftime = try_get_time(exiftime, exif_info_json, 'CreationDate')
+        for i in range(len(exiftime)):
+            if exiftime[i].tzinfo is None:
+                exiftime[i] = exiftime[i].replace(tzinfo=datetime.now().astimezone().tzinfo)
+        write_time = min(exiftime)
+        cmd = ['exiftool', '-QuickTime:CreationDate=' + write_time.strftime('%Y:%m:%d %H:%M:%S%z'),
+               str(target_path), '-overwrite_original']
+        assert cmd_runner(cmd)
+        if 'DateTimeOriginal' not in exif_info_json:
+            cmd = ['exiftool', '-DateTimeOriginal=' + write_time.strftime('%Y:%m:%d %H:%M:%S'),
+                   str(target_path), '-overwrite_original']
+            assert cmd_runner(cmd)
+    os.utime(target_path, (write_time.timestamp(), write_time.timestamp()))
@@ -0,0 +1,457 @@
+import os
+import json
+import logging
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from .common import in_format, cmd_runner, get_video_duration
+from .commit import scratch_prefix, make_temp_path, commit_file, cleanup_stale_temp_files
+from .metadata import copy_metadata
+
+
+def is_rotated_video_ffprobe(video_file):
+    try:
+        cmd = [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream_tags=rotate',
+            '-of', 'default=nw=1:nk=1',
+            str(video_file)
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logging.error(f"Cannot get rotation info for video {video_file}")
+            return False
+        rotation = result.stdout.strip()
+        if rotation == '':
+            rotation = 0
+        else:
+            rotation = int(rotation)
+        return rotation in [90, 270]
+    except Exception as e:
+        logging.error(f"Error checking video rotation: {e}")
+        return False
+
+
+def is_rotated_video_exiftool(video_file):
+    import re
+    try:
+        cmd = [
+            'exiftool',
+            '-n',
+            '-Rotation',
+            str(video_file)
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logging.error(f"Cannot get rotation info for video {video_file}")
+            return False
+        output = result.stdout.strip()
+        rotation = 0
+        if output:
+            match = re.search(r'Rotation\s*:\s*(\d+)', output)
+            if match:
+                rotation = int(match.group(1))
+        return rotation in [90, 270]
+    except Exception as e:
+        logging.error(f"Error checking video rotation: {e}")
+        return False
+
+
+def is_rotated_video(video_file):
+    return is_rotated_video_ffprobe(video_file) or is_rotated_video_exiftool(video_file)
+
+
+def get_video_size(source_path):
+    probe_result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+         'stream=width,height', '-of', 'csv=s=x:p=0', str(source_path)],
+        capture_output=True, text=True
+    )
+    if probe_result.returncode != 0:
+        raise RuntimeError(f"Failed to get video resolution for {source_path}")
+    width, height = map(int, probe_result.stdout.strip().split('x')[:2])
+    return width, height
+
+
+def needs_scaling(width, height, max_resolution):
+    return bool(max_resolution) and width * height > max_resolution
+
+
+def compute_scaled_size(width, height, rotated, max_resolution):
+    """Return the (width, height) a probed video should be scaled to, or None to keep it as is."""
+    if not needs_scaling(width, height, max_resolution):
+        return None
+    resolution = width * height
+    if rotated:
+        width, height = height, width
+    scale_factor = (max_resolution / resolution) ** 0.5
+    target_width = round(width * scale_factor)
+    target_height = round(height * scale_factor)
+    if target_width % 2 != 0:
+        target_width += 1
+    if target_height % 2 != 0:
+        target_height += 1
+    return target_width, target_height
+
+
+def get_scaled_size(source_path, max_resolution):
+    """Return the (width, height) a video should be scaled to, or None to keep it as is."""
+    width, height = get_video_size(source_path)
+    if not needs_scaling(width, height, max_resolution):
+        return None
+    return compute_scaled_size(width, height, is_rotated_video(source_path), max_resolution)
+
+
+def get_size_factor(source_path, target_path):
+    try:
+        source_size = source_path.stat().st_size
+        target_size = target_path.stat().st_size
+        if target_size > 0:
+            return source_size / target_size
+        return 0
+    except Exception as e:
+        logging.error(f"Error calculating size factor: {e}")
+        return 1.0  # Default to 1.0
+
+
+def convert_video(source_path, target_path, ffmpeg_args, max_resolution=None):
+    scale_filter = ""
+    size_factor = 1.0
+    try:
+        scaled_size = get_scaled_size(source_path, max_resolution)
+        if scaled_size:
+            scale_filter = f"-vf scale={scaled_size[0]}:{scaled_size[1]}"
+    except RuntimeError as e:
+        logging.error(e)
+        return False, size_factor
+    except Exception as e:
+        logging.error(f"Error getting video resolution: {e}")
+    cmd = [
+        'ffmpeg',
+        '-nostdin',  # 禁止后台化
+        '-i',
+        str(source_path),
+        *ffmpeg_args.split(),
+        *scale_filter.split(),
+        str(target_path)
+    ]
+    result = cmd_runner(cmd)
+    if result:
+        return True, get_size_factor(source_path, target_path)
+    return False, size_factor
+
+
+def find_video_filter_arg(ffmpeg_args):
+    """Return the first argument in ffmpeg_args that sets a video filter, or None."""
+    for arg in ffmpeg_args.split():
+        if arg in ('-vf', '-filter', '-filter_complex', '-lavfi') or arg.startswith('-filter:v'):
+            return arg
+    return None
+
+
+def load_renditions(renditions_file, output_dir):
+    """
+    Load a multi-output profile from a JSON file.
+
+    The file holds a list of renditions, e.g.
+    [{"name": "archive", "ffmpeg_args": "-c:v libsvtav1 -crf 36", "ext": ".mkv"},
+     {"name": "preview", "ffmpeg_args": "-c:v libx264 -crf 28", "max_resolution": 921600,
+      "output_dir": "/mnt/preview"}]
+    A relative output_dir is resolved against output_dir; a missing one defaults to
+    output_dir / name. Raises ValueError if two renditions would write the same files
+    or a rendition sets its own video filter, and for malformed profiles.
+    """
+    with open(renditions_file, encoding='utf-8') as f:
+        specs = json.load(f)
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("The profile must be a non-empty JSON list of renditions")
+    renditions = []
+    targets = {}
+    for i, spec in enumerate(specs):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Rendition {i} must be a JSON object")
+        if not isinstance(spec.get('ffmpeg_args'), str):
+            raise ValueError(f"Rendition {i} needs an 'ffmpeg_args' string")
+        for key, value_type, description in (('name', str, 'a string'), ('output_dir', str, 'a string'),
+                                             ('ext', str, 'a string'), ('max_resolution', int, 'an integer')):
+            value = spec.get(key)
+            if value is not None and (not isinstance(value, value_type) or isinstance(value, bool)):
+                raise ValueError(f"Rendition {i}: '{key}' must be {description}")
+        name = spec.get('name') or f'rendition{i}'
+        rendition_dir = Path(spec.get('output_dir') or name)
+        if not rendition_dir.is_absolute():
+            rendition_dir = Path(output_dir) / rendition_dir
+        ext = spec.get('ext') or '.mp4'
+        key = (os.path.normcase(os.path.abspath(rendition_dir)), ext.lower())
+        if key in targets:
+            raise ValueError(f"Renditions {targets[key]!r} and {name!r} both write {ext} files to {rendition_dir}")
+        targets[key] = name
+        # Each rendition's video comes from the shared -filter_complex, which a video filter would conflict with
+        video_filter_arg = find_video_filter_arg(spec['ffmpeg_args'])
+        if video_filter_arg:
+            raise ValueError(f"Rendition {name!r} sets its own video filter ({video_filter_arg}); "
+                             f"use max_resolution for scaling instead")
+        renditions.append({
+            'name': name,
+            'output_dir': rendition_dir,
+            'ffmpeg_args': spec['ffmpeg_args'],
+            'max_resolution': spec.get('max_resolution'),
+            'ext': ext,
+        })
+    return renditions
+
+
+def convert_video_renditions(source_path, outputs, side_outputs=None):
+    """
+    Decode source_path once and encode every (target_path, ffmpeg_args, max_resolution)
+    in outputs from a split filter graph. side_outputs (see index.prepare_side_outputs)
+    taps the same decode for thumbnails and hashes. Returns a list of (success, size_factor).
+    """
+    split_count = len(outputs) + (1 if side_outputs else 0)
+    filters = [f"[0:v:0]split={split_count}" + ''.join(f"[s{i}]" for i in range(split_count))]
+    output_args = []
+    # Probe size and rotation once per source, not once per rendition
+    try:
+        width, height = get_video_size(source_path)
+    except RuntimeError as e:
+        logging.error(e)
+        return [(False, 1.0)] * len(outputs)
+    except Exception as e:
+        logging.error(f"Error getting video resolution: {e}")
+        width = height = None
+    rotated = None
+    for i, (target_path, ffmpeg_args, max_resolution) in enumerate(outputs):
+        scaled_size = None
+        if width and needs_scaling(width, height, max_resolution):
+            if rotated is None:
+                rotated = is_rotated_video(source_path)
+            scaled_size = compute_scaled_size(width, height, rotated, max_resolution)
+        if scaled_size:
+            filters.append(f"[s{i}]scale={scaled_size[0]}:{scaled_size[1]}[v{i}]")
+        else:
+            filters.append(f"[s{i}]null[v{i}]")
+        output_args += ['-map', f'[v{i}]', '-map', '0:a:0?',
+                        *ffmpeg_args.split(), str(target_path)]
+    if side_outputs:
+        from .index import video_side_output_args
+        side_filters, side_args = video_side_output_args(side_outputs, f"[s{len(outputs)}]")
+        filters += side_filters
+        output_args += side_args
+    cmd = [
+        'ffmpeg',
+        '-nostdin',  # 禁止后台化
+        '-i',
+        str(source_path),
+        '-filter_complex', ';'.join(filters),
+        *output_args
+    ]
+    if not cmd_runner(cmd):
+        return [(False, 1.0)] * len(outputs)
+    return [(True, get_size_factor(source_path, target_path)) for target_path, _, _ in outputs]
+
+
+def convert_video_with_side_outputs(source_path, target_path, ffmpeg_args, side_outputs, max_resolution=None):
+    """
+    Like convert_video, but also taps the decode for side_outputs. The main output's
+    filter chain is left unlabeled, so ffmpeg attaches it to the first output file and
+    still picks audio and subtitle streams for it the same way convert_video does.
+    """
+    from .index import video_side_output_args
+    scale_filter = "null"
+    try:
+        scaled_size = get_scaled_size(source_path, max_resolution)
+        if scaled_size:
+            scale_filter = f"scale={scaled_size[0]}:{scaled_size[1]}"
+    except RuntimeError as e:
+        logging.error(e)
+        return False, 1.0
+    except Exception as e:
+        logging.error(f"Error getting video resolution: {e}")
+    side_filters, side_args = video_side_output_args(side_outputs, "[side]")
+    cmd = [
+        'ffmpeg',
+        '-nostdin',  # 禁止后台化
+        '-i',
+        str(source_path),
+        # 0:V skips attached pictures (cover art), like ffmpeg's default video selection
+        '-filter_complex', ';'.join([f"[0:V:0]split=2[main][side]", f"[main]{scale_filter}", *side_filters]),
+        *ffmpeg_args.split(),
+        str(target_path),
+        *side_args
+    ]
+    if cmd_runner(cmd):
+        return True, get_size_factor(source_path, target_path)
+    return False, 1.0
+
+
+def process_directory(input_dir, output_dir, delete_original, ffmpeg_args, ext='.mp4', max_resolution=3840*2160, all_files=None, temp_dir=None, renditions=None, index=False):
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Without a multi-output profile, the single output is a rendition of its own
+    multi_output = renditions is not None
+    if not multi_output:
+        renditions = [{'name': 'default', 'output_dir': output_dir, 'ffmpeg_args': ffmpeg_args,
+                       'max_resolution': max_resolution, 'ext': ext}]
+
+    if all_files is None:
+        all_files = [f for f in input_dir.rglob('*') if '@eaDir' not in str(f)]
+    video_files = [f for f in all_files if f.suffix.lower() in in_format]
+    index_dir = None
+    if index:
+        from .index import index_dirname
+        index_dir = output_dir / index_dirname
+
+    # Unique temp names are not reused, so sweep up scratch directories killed runs left behind
+    cleanup_stale_temp_files(temp_dir=temp_dir)
+
+    # Each run gets its own scratch directory so concurrent jobs can share temp_dir
+    job_dir = None
+    if temp_dir:
+        Path(temp_dir).mkdir(parents=True, exist_ok=True)
+        job_dir = Path(tempfile.mkdtemp(prefix=scratch_prefix, dir=temp_dir))
+
+    from tqdm import tqdm
+    all_success = True
+    try:
+        for video_file in tqdm(video_files, desc="Converting", ncols=50):
+            if not process_video_file(video_file, input_dir, renditions, multi_output, delete_original, job_dir, index_dir):
+                all_success = False
+    finally:
+        if job_dir:
+            shutil.rmtree(job_dir, ignore_errors=True)
+    return all_success
+
+
+def process_video_file(video_file, input_dir, renditions, multi_output, delete_original, job_dir=None, index_dir=None):
+    """Convert one video to every rendition. Returns True if all targets now exist."""
+    start_time = time.time()
+    logging.info(f"Start converting {video_file}")
+    relative_path = video_file.relative_to(input_dir)
+    jobs = []
+    for rendition in renditions:
+        target_file = rendition['output_dir'] / relative_path
+        target_file = target_file.with_suffix(rendition['ext'])
+        target_file.parent.mkdir(parents=True, exist_ok=True)
+        # If target file already exists, copy metadata and continue
+        if target_file.exists():
+            logging.info(f"Target file already exists: {target_file}")
+            copy_metadata(video_file, target_file)
+            continue
+        # Same for temp outputs and part files next to the targets, one folder at a time
+        cleanup_stale_temp_files([target_file.parent])
+        temp_output_file = make_temp_path(job_dir or target_file.parent, target_file)
+        jobs.append((rendition, target_file, temp_output_file))
+    if not jobs:
+        return True
+
+    # Prepare temporary input file
+    if job_dir:
+        temp_input_file = make_temp_path(job_dir, video_file)
+        # Copy source file to temp_dir
+        try:
+            shutil.copy2(video_file, temp_input_file)
+            # logging.info(f"Copied {video_file} to temp dir {temp_input_file}")
+        except Exception as e:
+            logging.error(f"Failed to copy {video_file} to temp dir {job_dir}: {e}")
+            return False
+    else:
+        temp_input_file = video_file
+
+    source_file = temp_input_file
+    side_outputs = None
+    committed = []
+
+    try:
+        source_duration = get_video_duration(str(source_file))
+        if index_dir:
+            from .index import prepare_side_outputs
+            try:
+                side_outputs = prepare_side_outputs(index_dir, relative_path, 'video', source_duration)
+            except Exception as e:
+                logging.error(f"Error preparing index outputs for {video_file}: {e}")
+        if side_outputs and not multi_output and find_video_filter_arg(renditions[0]['ffmpeg_args']):
+            logging.warning(f"Not indexing {video_file}: ffmpeg_args set their own video filter")
+            from .index import discard_side_outputs
+            discard_side_outputs(side_outputs)
+            side_outputs = None
+
+        def run_conversion(side_outputs):
+            if multi_output:
+                return convert_video_renditions(
+                    source_file, [(temp_output_file, rendition['ffmpeg_args'], rendition['max_resolution'])
+                                  for rendition, _, temp_output_file in jobs], side_outputs)
+            rendition = renditions[0]
+            if side_outputs:
+                return [convert_video_with_side_outputs(source_file, jobs[0][2], rendition['ffmpeg_args'],
+                                                        side_outputs, rendition['max_resolution'])]
+            return [convert_video(source_file, jobs[0][2], rendition['ffmpeg_args'], rendition['max_resolution'])]
+
+        results = run_conversion(side_outputs)
+        if side_outputs and not all(success for success, _ in results):
+            # The side outputs share the ffmpeg run, so they may be what failed; they must not cost the conversion
+            logging.warning(f"Conversion with side outputs failed for {video_file}, retrying without them")
+            from .index import discard_side_outputs
+            discard_side_outputs(side_outputs)
+            side_outputs = None
+            for _, _, temp_output_file in jobs:
+                if temp_output_file.exists():
+                    os.remove(temp_output_file)
+            results = run_conversion(None)
+        all_success = True
+        for (rendition, target_file, temp_output_file), (convert_success, size_factor) in zip(jobs, results):
+            if not convert_success:
+                # Conversion failed; remove temporary output file
+                if temp_output_file.exists():
+                    os.remove(temp_output_file)
+                logging.error(f"Failed to convert {video_file}")
+                all_success = False
+                continue
+            # Verify output duration
+            target_duration = get_video_duration(str(temp_output_file))
+            if (source_duration == 0 or abs(source_duration - target_duration) / source_duration > 0.05) and (source_duration - target_duration > 1):
+                logging.error(f"Duration mismatch: {source_duration} vs {target_duration}")
+                if temp_output_file.exists():
+                    os.remove(temp_output_file)
+                all_success = False
+                continue
+            # Write metadata while the file is still on local scratch, then move it into place once
+            copy_metadata(video_file, temp_output_file)
+            commit_file(temp_output_file, target_file)
+            committed.append(target_file)
+            if multi_output:
+                logging.info(f"Rendition {rendition['name']}: {target_file}, Size factor (source/target): {size_factor:.4f}")
+        if not all_success:
+            return False
+        if delete_original:
+            os.remove(video_file)
+        run_time = time.time() - start_time
+        time_ratio = run_time / source_duration if source_duration > 0 else 0
+        logging.info(f"Converted {video_file}")
+        if multi_output:
+            logging.info(f"Processing Time: {run_time:.2f}s, Time ratio: {time_ratio:.2f}x of real-time")
+        else:
+            logging.info(f"Size factor (source/target): {results[0][1]:.4f}, Processing Time: {run_time:.2f}s, Time ratio: {time_ratio:.2f}x of real-time")
+        return True
+    except Exception as e:
+        logging.error(f"Error processing {video_file}: {e}")
+        for _, _, temp_output_file in jobs:
+            if temp_output_file.exists():
+                os.remove(temp_output_file)
+        return False
+    finally:
+        if side_outputs:
+            from .index import finish_side_outputs, discard_side_outputs
+            # Index the source only once a target it can point to is in place
+            if committed:
+                finish_side_outputs(side_outputs, committed[0])
+            else:
+                discard_side_outputs(side_outputs)
+        # Clean up temporary input file
+        if job_dir and temp_input_file.exists():
+            os.remove(temp_input_file)
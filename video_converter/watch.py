@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import logging
+import traceback
+from pathlib import Path
+
+from .common import in_format
+from .video import process_directory
+
+network_fstypes = ('cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', 'fuse.sshfs', '9p')
+state_filename = '.watch_state.json'
+
+
+def is_network_mount(path):
+    """Check /proc/mounts for the filesystem holding path; inotify does not see changes made by other SMB/NFS clients."""
+    path = os.path.realpath(path)
+    best_mount, best_fstype = '', ''
+    try:
+        with open('/proc/mounts', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best_mount):
+                    best_mount, best_fstype = mount_point, fields[2]
+    except OSError:
+        return False
+    return best_fstype in network_fstypes
+
+
+def is_candidate(path):
+    return path.suffix.lower() in in_format and '@eaDir' not in str(path) and not path.name.startswith('.')
+
+
+def scan_tree(directory):
+    """Yield (path, stat) for every candidate video below directory using os.scandir."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != '@eaDir':
+                                stack.append(entry.path)
+                        elif entry.is_file() and is_candidate(Path(entry.path)):
+                            yield Path(entry.path), entry.stat()
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.error(f"Error scanning {current}: {e}")
+
+
+class WatchState:
+    """Files already handed to the converter, keyed by path and invalidated when size or mtime change."""
+
+    def __init__(self, state_path):
+        self.state_path = Path(state_path)
+        self.processed = {}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path, encoding='utf-8') as f:
+                    self.processed = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"Error loading watch state {self.state_path}: {e}")
+        # Sources that were deleted or moved away since the last run can never match again
+        stale = [path for path in self.processed if not os.path.exists(path)]
+        for path in stale:
+            del self.processed[path]
+        if stale:
+            self.save()
+
+    def is_processed(self, path, st):
+        return self.processed.get(str(path)) == [st.st_size, st.st_mtime]
+
+    def mark_processed(self, path, st):
+        self.processed[str(path)] = [st.st_size, st.st_mtime]
+        self.save()
+
+    def forget(self, path):
+        if self.processed.pop(str(path), None) is not None:
+            self.save()
+
+    def save(self):
+        temp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.processed, f, ensure_ascii=False)
+        os.replace(temp_path, self.state_path)
+
+
+class InotifyWatcher:
+    """Recursive inotify watcher on top of the optional inotify_simple package."""
+
+    def __init__(self, directory):
+        from inotify_simple import INotify, flags
+        self.flags = flags
+        self.inotify = INotify()
+        self.mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.DELETE_SELF | flags.MOVE_SELF
+        self.watches = {}
+        self.add_tree(directory)
+
+    def add_tree(self, directory):
+        for root, dirs, _ in os.walk(directory):
+            dirs[:] = [d for d in dirs if d != '@eaDir']
+            try:
+                self.watches[self.inotify.add_watch(root, self.mask)] = Path(root)
+            except OSError as e:
+                logging.error(f"Cannot watch {root}: {e}")
+
+    def read(self, timeout):
+        """
+        Return (paths, overflowed): the candidate paths touched within timeout seconds, and
+        whether the kernel queue overflowed, in which case events were lost and the caller
+        must rescan the tree.
+        """
+        paths = set()
+        overflowed = False
+        for event in self.inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & self.flags.Q_OVERFLOW:
+                overflowed = True
+                continue
+            if event.mask & self.flags.IGNORED:
+                # The watched directory was deleted (or unmounted) and the kernel dropped its watch
+                self.watches.pop(event.wd, None)
+                continue
+            if event.mask & self.flags.MOVE_SELF:
+                # A directory moved elsewhere would keep reporting events under its old path
+                try:
+                    self.inotify.rm_watch(event.wd)
+                except OSError:
+                    pass
+                self.watches.pop(event.wd, None)
+                continue
+            parent = self.watches.get(event.wd)
+            if parent is None or not event.name:
+                continue
+            path = parent / event.name
+            if event.mask & self.flags.ISDIR:
+                if event.mask & (self.flags.CREATE | self.flags.MOVED_TO):
+                    self.add_tree(path)
+                    # Files may have landed before the watch was added
+                    paths.update(p for p, _ in scan_tree(str(path)))
+            elif is_candidate(path):
+                paths.add(path)
+        return paths, overflowed
+
+
+def watch_directory(input_dir, output_dir, delete_original, ffmpeg_args, ext='.mp4', max_resolution=3840*2160, temp_dir=None, renditions=None,
+                    poll_interval=30, settle_time=10, force_poll=False, index=False, max_retry_delay=3600):
+    """
+    Convert videos as they appear in input_dir until interrupted.
+
+    New files are found with inotify when available and input_dir is local,
+    otherwise by polling with os.scandir every poll_interval seconds; with inotify
+    the tree is still rescanned every poll_interval, and at once if events were
+    lost to a queue overflow. A file is
+    converted once its size and mtime have not changed for settle_time seconds.
+    Failed conversions are retried with exponential backoff, up to max_retry_delay.
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state = WatchState(output_dir / state_filename)
+
+    watcher = None
+    if not force_poll and not is_network_mount(input_dir):
+        try:
+            watcher = InotifyWatcher(input_dir)
+            logging.info(f"Watching {input_dir} with inotify")
+        except (ImportError, OSError) as e:
+            logging.warning(f"inotify unavailable ({e}), falling back to polling")
+    if watcher is None:
+        logging.info(f"Polling {input_dir} every {poll_interval}s")
+
+    # path -> (size, mtime, time the file was last seen changing)
+    pending = {}
+    # path -> (size, mtime, number of failures, time of next attempt)
+    failed = {}
+
+    def add_pending(path, st=None):
+        try:
+            st = st or path.stat()
+        except OSError:
+            pending.pop(path, None)
+            failed.pop(path, None)
+            return
+        if state.is_processed(path, st):
+            return
+        failure = failed.get(path)
+        if failure and failure[:2] == (st.st_size, st.st_mtime) and time.monotonic() < failure[3]:
+            return
+        previous = pending.get(path)
+        if previous is None or previous[:2] != (st.st_size, st.st_mtime):
+            pending[path] = (st.st_size, st.st_mtime, time.monotonic())
+
+    for path, st in scan_tree(str(input_dir)):
+        add_pending(path, st)
+    last_scan = time.monotonic()
+
+    while True:
+        timeout = max(0.0, min(1 if pending else poll_interval, last_scan + poll_interval - time.monotonic()))
+        rescan = False
+        if watcher:
+            paths, rescan = watcher.read(timeout=timeout)
+            for path in paths:
+                add_pending(path)
+            if rescan:
+                logging.warning("inotify queue overflowed, rescanning input directory")
+                # Directories created while events were lost have no watch yet
+                watcher.add_tree(input_dir)
+        else:
+            time.sleep(timeout)
+        if rescan or time.monotonic() - last_scan >= poll_interval:
+            for path, st in scan_tree(str(input_dir)):
+                add_pending(path, st)
+            last_scan = time.monotonic()
+
+        now = time.monotonic()
+        for path in list(pending):
+            add_pending(path)
+            if path not in pending or now - pending[path][2] < settle_time:
+                continue
+            size, mtime, _ = pending.pop(path)
+            if size == 0:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            # One bad file (or a NAS hiccup) must not stop the daemon; it goes through the retry path instead
+            try:
+                success = process_directory(input_dir, output_dir, delete_original, ffmpeg_args, ext=ext,
+                                            max_resolution=max_resolution, all_files=[path], temp_dir=temp_dir,
+                                            renditions=renditions, index=index)
+                if success:
+                    failed.pop(path, None)
+                    if path.exists():
+                        state.mark_processed(path, st)
+                    else:
+                        # Removed by --delete, so there is nothing left to skip
+                        state.forget(path)
+            except Exception:
+                logging.error(f"Error processing {path}: {traceback.format_exc()}")
+                success = False
+            if not success:
+                # A changed file (e.g. still being written) is retried as soon as it settles again
+                failure = failed.get(path)
+                attempts = failure[2] + 1 if failure and failure[:2] == (st.st_size, st.st_mtime) else 1
+                delay = min(settle_time * 2 ** attempts, max_retry_delay)
+                failed[path] = (st.st_size, st.st_mtime, attempts, time.monotonic() + delay)
+                logging.warning(f"Conversion of {path} failed, retrying in {delay:.0f}s")